@@ -1,12 +1,19 @@
 import streamlit as st
 from pymongo import MongoClient
 import requests
-import json
 import re
-import spacy
 import asyncio
-from fuzzywuzzy import fuzz
-from requests.exceptions import HTTPError
+import threading
+import contextlib
+import hashlib
+from collections import OrderedDict
+import aiohttp
+import orjson
+import logging
+from pymongo.errors import OperationFailure, PyMongoError
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+logger = logging.getLogger(__name__)
 
 # # MongoDB connection
 # def connect_to_mongodb():
@@ -15,41 +22,98 @@ from requests.exceptions import HTTPError
 #     return db
 
 
+# Case-insensitive collation shared by the name index and exact-match lookups
+NAME_COLLATION = {'locale': 'en', 'strength': 2}
+
+
+# Create the indexes used by check_client_in_db (no-op when they already exist).
+# They only speed up lookups, so a read-only role or a clashing index is logged, not raised.
+def ensure_client_indexes(db):
+    client_collection = db['clients']
+    for keys, options in (
+        ([('name', 'text')], {}),
+        ([('name', 1)], {'name': 'name_ci', 'collation': NAME_COLLATION}),
+    ):
+        try:
+            client_collection.create_index(keys, **options)
+        except PyMongoError as e:
+            logger.warning(f"Could not create client index {keys}: {e}")
+
+
+# MongoDB client shared across reruns, so the pool and monitor threads are created once.
+# Failures raise instead of returning, so a broken connection is never cached.
+@st.cache_resource
+def get_mongo_client():
+    client = MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=5000, maxPoolSize=20)
+    try:
+        # Trigger server check
+        client.admin.command('ping')
+    except Exception:
+        client.close()
+        raise
+    ensure_client_indexes(client['meeting_scheduling'])
+    return client
+
+
 # MongoDB connection
 def connect_to_mongodb():
     try:
-        client = MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=5000)
-        db = client['meeting_scheduling']
-        # Trigger server check
-        client.server_info()
-        return db
+        return get_mongo_client()['meeting_scheduling']
     except Exception as e:
         st.error(f"Error connecting to MongoDB: {str(e)}")
         return None
 
 
 
-# # Function to check if client exists in database
-# def check_client_in_db(db, client_name):
-#     client_collection = db['clients']
+# Only the fields the lookup needs are transferred from MongoDB
+CLIENT_PROJECTION = {'name': 1, 'email': 1, '_id': 0}
+
 
-#     ## To handle user input in lower case
-#     client_name_lower = client_name.lower()
-#     # client = client_collection.find_one({'name': client_name})
-#     client = client_collection.find_one({'name': {'$regex': f'^{client_name_lower}$', '$options': 'i'}})
-#     if client:
-#         return {'exists': True, 'email': client['email']}
-#     return {'exists': False, 'email': None}
+# Fuzzy-match threshold. The original integer fuzz.ratio(...) > 90 accepted rounded scores
+# of 91 and up, i.e. raw ratios of at least 90.5.
+NAME_SCORE_CUTOFF = 90.5
+
+
+# Client names mapped to their emails, reloaded from MongoDB at most once a minute
+@st.cache_resource(ttl=60)
+def load_client_emails(_db):
+    clients = _db['clients'].find({}, CLIENT_PROJECTION).batch_size(500)
+    return {client['name']: client['email'] for client in clients}
 
 
 # Function to check if client exists in database with fuzzy matching
 def check_client_in_db(db, client_name):
     try:
         client_collection = db['clients']
-        clients = client_collection.find()
-        for client in clients:
-            if fuzz.ratio(client['name'], client_name) > 90:  # Fuzzy matching with 80% similarity
-                return {'exists': True, 'email': client['email']}
+
+        # Fast path: case-insensitive exact match served by the collated index
+        client = client_collection.find_one(
+            {'name': client_name}, CLIENT_PROJECTION, collation=NAME_COLLATION
+        )
+        if client:
+            return {'exists': True, 'email': client['email']}
+
+        # Fuzzy-rank the few most relevant text-index candidates instead of scanning every client
+        from rapidfuzz import fuzz, process
+        try:
+            candidates = {
+                client['name']: client['email']
+                for client in client_collection.find(
+                    {'$text': {'$search': client_name}},
+                    {**CLIENT_PROJECTION, 'score': {'$meta': 'textScore'}}
+                ).sort([('score', {'$meta': 'textScore'})]).limit(5)
+            }
+        except OperationFailure:
+            candidates = {}  # No text index on name; the cached table below still works
+        match = process.extractOne(client_name, list(candidates), scorer=fuzz.ratio, score_cutoff=NAME_SCORE_CUTOFF)
+
+        if match is None:
+            # Text search misses names with every token misspelt; fall back to the cached table
+            candidates = load_client_emails(db)
+            match = process.extractOne(client_name, list(candidates), scorer=fuzz.ratio, score_cutoff=NAME_SCORE_CUTOFF)
+
+        if match is not None:  # Fuzzy matching with more than 90% similarity
+            return {'exists': True, 'email': candidates[match[0]]}
         return {'exists': False, 'email': None}
     except Exception as e:
         st.error(f"Error querying MongoDB: {str(e)}")
@@ -58,21 +122,115 @@ def check_client_in_db(db, client_name):
 
 
 
-# Load spaCy's English NER model
-nlp = spacy.load("en_core_web_sm")
+# Load spaCy's English NER model once per process, keeping only the NER pipe
+@st.cache_resource
+def get_nlp():
+    import spacy  # Imported lazily: loading spaCy alone takes seconds
+    return spacy.load(
+        "en_core_web_sm",
+        exclude=["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+    )
+
+
+# Valid client names: letters and whitespace only
+_NAME_RE = re.compile(r"^[A-Za-z\s]+\Z")
+# _WHITESPACE_RE = re.compile(r'\s+')
 
 
 # # Preprocess input text: remove extra spaces, lowercase, and normalize punctuation
 # def preprocess_input(text):
-#     return re.sub(r'\s+', ' ', text.strip()).lower()
+#     return _WHITESPACE_RE.sub(' ', text.strip()).lower()
+
+
+# Named entities of a prompt as (text, label) pairs, memoised across reruns
+@st.cache_data(max_entries=256)
+def _ner(text):
+    return [(ent.text, ent.label_) for ent in get_nlp()(text).ents]
+
+
+# Pick the first valid PERSON entity from (text, label) pairs
+def person_from_ents(ents):
+    for ent_text, label in ents:
+        if label == "PERSON":
+            # Ensure it's a valid name (alphabetical and no special characters)
+            if _NAME_RE.match(ent_text):
+                return {"client_name": ent_text}
+    
+    return {"client_name": "Could not extract a person name"}
+
+
+# Batched variant of extract_person_name for several prompts at once
+def extract_person_names(texts):
+    docs = get_nlp().pipe(texts, batch_size=32, n_process=1)
+    return [person_from_ents([(ent.text, ent.label_) for ent in doc.ents]) for doc in docs]
+
+
+# Aho-Corasick automaton over known client names, rebuilt at most every five minutes
+@st.cache_resource(ttl=300)
+def get_client_automaton(_db):
+    clients = load_client_emails(_db)
+    if not clients:
+        return None
+    import ahocorasick
+    automaton = ahocorasick.Automaton()
+    for name, email in clients.items():
+        key = name.lower()
+        automaton.add_word(key, (len(key), name, email))
+    automaton.make_automaton()
+    return automaton
+
+
+# Whether a matched span reads as a name: every word capitalised, and a one-word
+# name not opening a sentence, where "Will" or "Mark" may just be an ordinary word
+def looks_like_name(text, start, end):
+    words = text[start:end + 1].split()
+    if not all(word[0].isupper() for word in words):
+        return False
+    if len(words) == 1:
+        before = text[:start].rstrip()
+        return bool(before) and before[-1] not in '.!?'
+    return True
+
+
+# Longest known client name appearing as whole words in the text, as (name, email)
+def find_known_client(automaton, text):
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Some characters (e.g. "İ") lower-case to two, so offsets no longer map back to
+        # the original text for the capitalisation check; leave such prompts to NER
+        return None
+    best = None
+    for end, (length, name, email) in automaton.iter(lowered):
+        start = end - length + 1
+        # Skip hits inside longer words, e.g. "Al" in "Alice"
+        if start > 0 and lowered[start - 1].isalnum():
+            continue
+        if end + 1 < len(lowered) and lowered[end + 1].isalnum():
+            continue
+        # Keys are lower-cased, so check the original text for capitalisation
+        if not looks_like_name(text, start, end):
+            continue
+        if best is None or length > best[0]:
+            best = (length, name, email)
+    return best[1:] if best else None
 
 
 # Function to extract person name from text
-def extract_person_name(text):
+def extract_person_name(text, db=None):
     """
     Extract the client's name from the given text using Named Entity Recognition (NER).
+    When db is given, known client names are matched first and returned with their email.
     """
    
+    if db is not None:
+        try:
+            automaton = get_client_automaton(db)
+            known = find_known_client(automaton, text) if automaton else None
+            if known:
+                return {"client_name": known[0], "email": known[1]}
+        except Exception as e:
+            st.error(f"Error loading client names: {str(e)}")
+
     function_definition = {
         "name": "extract_client_name",
         "description": "Extract the client's name from the given text",
@@ -89,7 +247,7 @@ def extract_person_name(text):
     }
 
     # text = preprocess_input(text)  # Preprocess text for normalization
-    doc = nlp(text)
+    ents = _ner(text)
 
 
     # # Look for PERSON entities in the text
@@ -100,13 +258,7 @@ def extract_person_name(text):
 
 
     # Look for PERSON entities in the text
-    for ent in doc.ents:
-        if ent.label_ == "PERSON":
-            # Ensure it's a valid name (alphabetical and no special characters)
-            if re.match(r"^[a-zA-Z\s]+$", ent.text):
-                return {"client_name": ent.text}
-    
-    return {"client_name": "Could not extract a person name"}
+    return person_from_ents(ents)
 
     
     
@@ -121,7 +273,7 @@ def extract_person_name(text):
     ]
     
     data = {
-        "model": "gemma2:2b",
+        "model": OLLAMA_MODEL,
         "messages": messages,
         "functions": [function_definition],
         "function_call": {"name": "extract_person_name"}
@@ -132,68 +284,249 @@ def extract_person_name(text):
     
     # if response.status_code == 200:
     #     try:
-    #         function_call = json.loads(response.json()['message']['function_call'])
+    #         function_call = orjson.loads(orjson.loads(response.content)['message']['function_call'])
     #         return function_call['arguments']['person_name']
     #     except:
     #         return None
     # return None
 
 
-# Function to make async API call to Ollama LLM for further processing (Asynchronus Method)
-async def call_ollama_api_async(data):
-    loop = asyncio.get_event_loop()
-    headers = {'Content-Type': 'application/json'}  # Specify content type
+OLLAMA_BASE_URL = 'http://localhost:11434'
+
+
+# aiohttp session for one click. A session is bound to the loop it was created on, and each
+# click (and each browser session's script thread) has its own loop, so none is shared.
+async def open_session():
+    return aiohttp.ClientSession(
+        base_url=OLLAMA_BASE_URL,
+        connector=aiohttp.TCPConnector(limit=16, keepalive_timeout=60),
+        # Streamed replies can run long, but an unreachable server should fail fast
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=5)
+    )
+
+
+# Open a keep-alive connection to Ollama ahead of the chat request on the same session
+async def warm_ollama_session(session):
     try:
-        print("Data being sent:", data)  # Debugging line
-        response = await loop.run_in_executor(
-            None,
-            lambda: requests.post('http://localhost:11434/api/chat', json=data, headers=headers)
+        async with session.get('/api/version') as response:
+            await response.read()
+    except aiohttp.ClientError:
+        pass  # get_llm_response reports connection problems itself
+
+
+# Load the chat model into Ollama's memory without generating anything
+def warm_ollama_model():
+    try:
+        requests.post(
+            f'{OLLAMA_BASE_URL}/api/generate',
+            json={'model': OLLAMA_MODEL, 'keep_alive': '30m'},
+            timeout=120
         )
+    except requests.RequestException:
+        pass  # get_llm_response reports connection problems itself
+
+
+# Run a blocking call in a worker thread that can still write to the Streamlit page
+async def to_script_thread(func, *args):
+    ctx = get_script_run_ctx()
+
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return func(*args)
+
+    return await asyncio.to_thread(run)
+
+
+# Function to stream the Ollama LLM reply chunk by chunk (Asynchronus Method)
+async def call_ollama_api_async(session, body):
+    headers = {'Content-Type': 'application/json'}
+    async with session.post('/api/chat', data=body, headers=headers) as response:
         response.raise_for_status()  # Raises an error for bad responses
-        return response.json()['message']['content']
-    except HTTPError as err:
-        error_content = err.response.content.decode()  # Get the response content
-        st.error(f"HTTP error occurred: {err}\nDetails: {error_content}")
-    except Exception as err:
-        st.error(f"An error occurred: {err}")
-    return None
+        # Ollama streams one JSON object per line until "done" is set
+        async for line in response.content:
+            if not line.strip():
+                continue
+            chunk = orjson.loads(line)
+            content = chunk.get('message', {}).get('content')
+            if content:
+                yield content
+            if chunk.get('done'):
+                break
+
+
+
+# Maximum number of LLM responses remembered per browser session
+RESPONSE_CACHE_SIZE = 512
 
 
+# LRU cache of LLM responses, kept in session state so it survives Streamlit reruns
+def get_response_cache():
+    if 'response_cache' not in st.session_state:
+        st.session_state['response_cache'] = OrderedDict()
+    return st.session_state['response_cache']
+
+
+# Cache key for an exact list of chat messages
+def response_cache_key(messages):
+    return hashlib.blake2b("\0".join(m['content'] for m in messages).encode()).digest()
+
+
+# Quantized chat model; smaller weights mean less memory bandwidth per generated token
+OLLAMA_MODEL = "gemma2:2b-instruct-q4_K_M"
+
+# Prompts and replies here are short, so a small context avoids over-allocating the KV cache
+OLLAMA_OPTIONS = {"num_ctx": 1024, "num_batch": 128}
+
+
+# Static system prompts. They are sent byte-identical on every request (the client's
+# email goes in a separate message) so Ollama can reuse the KV cache for the prefix.
+SYS_CLIENT_TMPL = """You are a helpful assistant. The person mentioned is a client; their email is given next.
+Include this information naturally in your response."""
+SYS_NOCLIENT = "You are a helpful assistant. The person mentioned is not found in our client database."
+
+
+# Serialise the static part of a chat request once: everything up to and including the
+# system prompt, left open so the per-request messages can be appended as raw bytes
+def chat_body_head(system_prompt):
+    return orjson.dumps({
+        "model": OLLAMA_MODEL,
+        "stream": True,
+        "options": OLLAMA_OPTIONS,
+        "keep_alive": "30m",  # Keep the model and its prompt cache resident between clicks
+        "messages": [{"role": "system", "content": system_prompt}]
+    })[:-2]
+
+
+CLIENT_BODY_HEAD = chat_body_head(SYS_CLIENT_TMPL)
+NOCLIENT_BODY_HEAD = chat_body_head(SYS_NOCLIENT)
+
+
+# Complete a pre-serialised request head with the per-request messages
+def build_chat_body(head, messages):
+    return head + b"".join(b"," + orjson.dumps(message) for message in messages) + b"]}"
+
 
 # Function to get LLM response
-async def get_llm_response(prompt, client_info):
-    # Create system prompt based on client information
+async def get_llm_response(session, prompt, client_info):
+    # Pick the system prompt based on client information
     if client_info['exists']:
-        system_prompt = f"""You are a helpful assistant. The person mentioned is a client with email: {client_info['email']}.
-        Include this information naturally in your response."""
+        system_prompt, head = SYS_CLIENT_TMPL, CLIENT_BODY_HEAD
+        request_messages = [{"role": "system", "content": f"Email: {client_info['email']}"}]
     else:
-        system_prompt = "You are a helpful assistant. The person mentioned is not found in our client database."
-    
+        system_prompt, head = SYS_NOCLIENT, NOCLIENT_BODY_HEAD
+        request_messages = []
+    request_messages.append({"role": "user", "content": prompt})
+
     # Create the API request for Ollama
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": prompt}
-    ]
-    
-    data = {
-        "model": "gemma2:2b",
-        "messages": messages
-    }
+    messages = [{"role": "system", "content": system_prompt}] + request_messages
+    body = build_chat_body(head, request_messages)
     
     # # Make API call to local Ollama instance
     # response = requests.post('http://localhost:11434/api/chat', json=data)
 
-    # Make API call to local Ollama instance asynchronously
-    return await call_ollama_api_async(data)
+    # Identical prompts are answered from the cache without a round-trip to Ollama
+    cache = get_response_cache()
+    key = response_cache_key(messages)
+    if key in cache:
+        cache.move_to_end(key)
+        yield cache[key]
+        return
+
+    # Stream the reply from the local Ollama instance, caching it once complete
+    chunks = []
+    try:
+        async for chunk in call_ollama_api_async(session, body):
+            chunks.append(chunk)
+            yield chunk
+    except aiohttp.ClientResponseError as err:
+        st.error(f"HTTP error occurred: {err.status}\nDetails: {err.message}")
+        return
+    except Exception as err:
+        st.error(f"An error occurred: {err}")
+        return
+
+    cache[key] = "".join(chunks)
+    if len(cache) > RESPONSE_CACHE_SIZE:
+        cache.popitem(last=False)
     
     # if response.status_code == 200:
-    #     return response.json()['message']['content']
+    #     return orjson.loads(response.content)['message']['content']
     # return "Error: Could not get response from LLM"
 
+# Keywords marking a short prompt as a plain client lookup. Scheduling requests are
+# deliberately absent; they need a real reply from the LLM.
+LOOKUP_KEYWORDS = ("email", "contact", "who is")
+
+
+# Whether a prompt can be answered from the client record without the LLM
+def is_lookup_prompt(user_prompt):
+    prompt = user_prompt.lower()
+    return len(prompt.split()) < 12 and any(kw in prompt for kw in LOOKUP_KEYWORDS)
+
+
+# Resolve the client for a single prompt and pick how to answer it.
+# The response is either a ready string or an async generator of LLM chunks.
+async def main_async(db, user_prompt, session):
+    # Extract client name off the event loop while the Ollama connection opens
+    extracted_name, _ = await asyncio.gather(
+        to_script_thread(extract_person_name, user_prompt, db),
+        warm_ollama_session(session),
+    )
+    client_name = extracted_name.get('client_name')
+
+    if not client_name or client_name == "Could not extract a person name":
+        return client_name, None, None
+
+    if extracted_name.get('email'):
+        # Known client spotted by the name automaton; no lookup needed
+        client_info = {'exists': True, 'email': extracted_name['email']}
+    else:
+        # Check client in database
+        client_info = await to_script_thread(check_client_in_db, db, client_name)
+
+    if client_info['exists'] and is_lookup_prompt(user_prompt):
+        # The client's email is the whole answer; skip the Ollama round-trip
+        response = f"{client_name}'s email is {client_info['email']}."
+    else:
+        # Get LLM response
+        response = get_llm_response(session, user_prompt, client_info)
+
+    return client_name, client_info, response
+
+
+# Event loop and Ollama session for one click. Unlike asyncio.run the loop stays open
+# while the response streams.
+@contextlib.contextmanager
+def click_event_loop():
+    loop = asyncio.new_event_loop()
+    session = loop.run_until_complete(open_session())
+    try:
+        yield loop, session
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(session.close())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+
+# Drive an async generator from synchronous code so st.write_stream can consume it
+def iterate_on_loop(loop, agen):
+    while True:
+        try:
+            yield loop.run_until_complete(agen.__anext__())
+        except StopAsyncIteration:
+            return
+
+
 # Streamlit UI
 def main():
     st.title("Meeting Scheduling Chatbot")
     st.write("Enter your prompt with a client's name to get information")
+
+    # Start loading the model on first page load so the first click skips the cold start
+    if 'warm' not in st.session_state:
+        threading.Thread(target=warm_ollama_model, daemon=True).start()
+        st.session_state['warm'] = True
     
     # Initialize MongoDB connection
     db = connect_to_mongodb()
@@ -210,21 +543,16 @@ def main():
     
     if st.button("Get Response"):
         if user_prompt:
-            with st.spinner("Processing..."):
-                # Extract client name
-                extracted_name = extract_person_name(user_prompt)
-                client_name = extracted_name.get('client_name')
+            with st.spinner("Processing..."), click_event_loop() as (loop, session):
+                client_name, client_info, response = loop.run_until_complete(main_async(db, user_prompt, session))
                 
-                if client_name and client_name != "Could not extract a person name":
-                    # Check client in database
-                    client_info = check_client_in_db(db, client_name)
-                    
-                    # Get LLM response
-                    response = asyncio.run(get_llm_response(user_prompt, client_info))
-                    
+                if client_info is not None:
                     # Display response
                     st.write("Response:")
-                    st.write(response)
+                    if isinstance(response, str):
+                        st.write(response)
+                    else:
+                        st.write_stream(iterate_on_loop(loop, response))
                     
                     # Display client status
                     st.write("\nClient Status:")
@@ -2,6 +2,7 @@ import streamlit as st
 from pymongo import MongoClient
 from datetime import datetime, timedelta
 import json
+import asyncio
 from O365 import Account
 import smtplib
 from email.mime.text import MIMEText
@@ -122,6 +123,20 @@ Process the user's request and call the appropriate functions in the correct ord
         system=system_prompt
     )
 
+# Issue the client-name and meeting-details prompts concurrently
+async def extract_meeting_request(llm, user_prompt, user_email):
+    return await asyncio.gather(
+        llm.apredict(f"""
+            Process this meeting request and extract the client name to query the database:
+            {user_prompt}
+            """),
+        llm.apredict(f"""
+            Extract complete meeting details from this request to create calendar event:
+            {user_prompt}
+            Include the following attendee: {user_email}
+            """),
+    )
+
 # Streamlit app
 def main():
     st.title("AI Meeting Scheduler with Function Calling")
@@ -140,11 +155,10 @@ def main():
         llm = create_llm()
         
         try:
-            # First function call to extract meeting details
-            response = llm.predict(f"""
-            Process this meeting request and extract the client name to query the database:
-            {user_prompt}
-            """)
+            # Extract the client name and meeting details in one round of LLM calls
+            response, meeting_details_response = asyncio.run(
+                extract_meeting_request(llm, user_prompt, user_email)
+            )
             
             # Query database
             db_tool = DatabaseTool()
@@ -154,13 +168,6 @@ def main():
                 st.error("Client not found in database")
                 return
                 
-            # Extract complete meeting details
-            meeting_details_response = llm.predict(f"""
-            Extract complete meeting details from this request to create calendar event:
-            {user_prompt}
-            Include the following attendees: {user_email}, {client_info['email']}
-            """)
-            
             meeting_details = json.loads(meeting_details_response)
             
             # Create calendar event
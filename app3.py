@@ -1,20 +1,42 @@
 import streamlit as st
 from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 import requests
-import json
 import re
-import spacy
 import asyncio
-from fuzzywuzzy import fuzz
+import threading
+import contextlib
+import aiohttp
+import orjson
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError, ConnectionError
-from typing import Dict, Optional, Any
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Any, Tuple
 import logging
-import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@st.cache_resource
+def get_mongo_client(uri: str) -> MongoClient:
+    """Create one pooled MongoClient per URI for the life of the process."""
+    client = MongoClient(uri, maxPoolSize=50, minPoolSize=5,
+                         maxIdleTimeMS=300_000, serverSelectionTimeoutMS=5000)
+    try:
+        # Verify connection; raising keeps an unreachable server out of the cache
+        client.admin.command('ping')
+    except Exception:
+        client.close()
+        raise
+
+    try:
+        # Speeds up name lookups; the app still works without it, e.g. on a read-only role
+        client['meeting_scheduling']['clients'].create_index([('name', 1)])
+    except PyMongoError as e:
+        logger.warning(f"Could not create client name index: {str(e)}")
+    return client
+
 class DatabaseConnection:
     def __init__(self, uri: str = 'mongodb://localhost:27017/'):
         self.uri = uri
@@ -24,22 +46,44 @@ class DatabaseConnection:
     def connect(self) -> Optional[Any]:
         """Establish connection to MongoDB with proper error handling."""
         try:
-            self.client = MongoClient(self.uri, serverSelectionTimeoutMS=5000)
+            self.client = get_mongo_client(self.uri)
             self.db = self.client['meeting_scheduling']
-            # Verify connection
-            self.client.server_info()
             return self.db
         except Exception as e:
             logger.error(f"MongoDB connection error: {str(e)}")
             st.error(f"Database connection error: {str(e)}")
             return None
 
-    def close(self):
-        """Safely close the database connection."""
-        if self.client:
-            self.client.close()
+@st.cache_resource(ttl=60)
+def load_client_table(_collection) -> Dict[str, list]:
+    """Load client names and emails as parallel lists, refreshed at most once a minute."""
+    from rapidfuzz.utils import default_process
+
+    clients = list(_collection.find({}, {'name': 1, 'email': 1, '_id': 0}))
+    # Names are normalised once here rather than on every comparison
+    names_norm = [default_process(client['name']) for client in clients]
+    emails = [client['email'] for client in clients]
+    return {
+        'names_norm': names_norm,
+        'emails': emails,
+        'by_lower': {client['name'].lower(): client['email'] for client in clients},
+        # Punctuation and repeated whitespace dropped, so "o'neil  " finds "O'Neil"
+        'by_norm': {''.join(name.split()): email for name, email in zip(names_norm, emails)},
+    }
+
+def exact_client_email(table: Dict[str, Any], client_name: str) -> Optional[str]:
+    """Email of the client whose name matches exactly or up to case and punctuation, else None."""
+    from rapidfuzz.utils import default_process
+
+    email = table['by_lower'].get(client_name.lower())
+    if email is None:
+        email = table['by_norm'].get(''.join(default_process(client_name).split()))
+    return email
 
 class ClientManager:
+    # Same as the original integer fuzz.ratio(...) > 90, which rounded 90.5 up to 91
+    NAME_SCORE_CUTOFF = 90.5
+
     def __init__(self, db):
         self.db = db
         self.collection = db['clients']
@@ -53,78 +97,192 @@ class ClientManager:
             if not client_name:
                 return {'exists': False, 'email': None}
 
-            clients = list(self.collection.find())  # Convert cursor to list
-            if not clients:
-                return {'exists': False, 'email': None}
+            from rapidfuzz import fuzz, process
+            from rapidfuzz.utils import default_process
 
-            best_match = max(
-                ((client, fuzz.ratio(client['name'].lower(), client_name.lower()))
-                 for client in clients),
-                key=lambda x: x[1],
-                default=(None, 0)
+            table = load_client_table(self.collection)
+            # Exact and near-exact names are the common case; skip the scorer for them
+            email = exact_client_email(table, client_name)
+            if email is not None:
+                return {'exists': True, 'email': email}
+
+            # Both sides are already normalised, so skip rapidfuzz's per-choice processing
+            match = process.extractOne(
+                default_process(client_name), table['names_norm'],
+                processor=None, scorer=fuzz.ratio, score_cutoff=self.NAME_SCORE_CUTOFF
             )
 
-            if best_match[0] and best_match[1] > 90:
-                return {'exists': True, 'email': best_match[0]['email']}
+            if match is not None:
+                return {'exists': True, 'email': table['emails'][match[2]]}
             return {'exists': False, 'email': None}
 
         except Exception as e:
             logger.error(f"Error querying MongoDB: {str(e)}")
             return {'exists': False, 'email': None}
 
+@st.cache_resource
+def get_nlp():
+    """Load the spaCy model once per process, keeping only the NER pipe."""
+    import spacy  # Imported lazily: loading spaCy alone takes seconds
+    return spacy.load(
+        "en_core_web_sm",
+        exclude=["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+    )
+
 class NameExtractor:
-    def __init__(self):
+    # Valid client names: letters, whitespace, apostrophes and hyphens
+    _NAME_RE = re.compile(r"^[A-Za-z\s'\-]+$")
+
+    # Runs of capitalised words, e.g. "John Doe" in "meet John Doe on Monday"
+    _NAME_CANDIDATE_RE = re.compile(
+        r"\b[A-Z][a-z]*(?:['’-][A-Z]?[a-z]+)*(?:\s+[A-Z][a-z]*(?:['’-][A-Z]?[a-z]+)*)+\b"
+    )
+
+    # Capitalised words that are never part of a client name
+    _NON_NAME_WORDS = frozenset({
+        "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday",
+        "January", "February", "March", "April", "May", "June", "July", "August",
+        "September", "October", "November", "December",
+        "Today", "Tomorrow", "Tonight", "Next", "This", "Morning", "Afternoon", "Evening",
+        "Hi", "Hello", "Hey", "Dear", "Please", "Can", "Could", "Would", "Will", "I",
+        "Schedule", "Book", "Set", "Arrange", "Meeting", "Meet", "Call", "With", "And",
+        "The", "On", "At", "Mr", "Mrs", "Ms", "Dr",
+    })
+
+    def __init__(self, collection=None):
+        # Clients collection; a pattern match is only trusted when it names a known client
+        self.collection = collection
+        self._nlp = None
+        self._person_label = None
+
+    @property
+    def nlp(self):
+        """spaCy pipeline, loaded on first use so regex-resolved prompts never need it."""
+        if self._nlp is None:
+            try:
+                self._nlp = get_nlp()
+                # Integer ID of the PERSON label, so entities are compared without string lookups
+                self._person_label = self._nlp.vocab.strings["PERSON"]
+            except OSError:
+                st.error("Please install the English language model: python -m spacy download en_core_web_sm")
+                raise
+        return self._nlp
+
+    def _client_table(self) -> Optional[Dict[str, Any]]:
+        """Cached client table, or None when there is no collection or it cannot be read."""
+        if self.collection is None:
+            return None
         try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            st.error("Please install the English language model: python -m spacy download en_core_web_sm")
-            raise
+            return load_client_table(self.collection)
+        except Exception as e:
+            logger.warning(f"Client table unavailable for name matching: {str(e)}")
+            return None
 
-    def extract_person_name(self, text: str) -> Dict[str, str]:
-        """Extract person name from text using NER."""
+    def _match_name_pattern(self, text: str, table: Dict[str, Any]) -> str:
+        """Return the first run of two to four capitalised words naming a known client, or ""."""
+        for match in self._NAME_CANDIDATE_RE.finditer(text):
+            run = []
+            for word in match.group().split() + [None]:
+                if word is not None and word not in self._NON_NAME_WORDS:
+                    run.append(word)
+                    continue
+                if 2 <= len(run) <= 4:
+                    name = " ".join(run)
+                    # "New York" or "Acme Corp" fit the pattern too; only a client name is final
+                    if self._NAME_RE.match(name) and exact_client_email(table, name) is not None:
+                        return name
+                run = []
+        return ""
+
+    def _person_from_doc(self, doc) -> str:
+        """Return the first valid PERSON entity in a parsed doc, or ""."""
+        # Look for PERSON entities
+        for ent in doc.ents:
+            if ent.label == self._person_label:
+                # Validate name format
+                name = ent.text.strip()
+                if self._NAME_RE.match(name):
+                    return name
+        return ""
+
+    def extract_person_names(self, texts: List[str]) -> List[Dict[str, str]]:
+        """Extract person names from several texts, batching the NER fallback through nlp.pipe."""
         try:
-            doc = self.nlp(text)
-            
-            # Look for PERSON entities
-            for ent in doc.ents:
-                if ent.label_ == "PERSON":
-                    # Validate name format
-                    name = ent.text.strip()
-                    if re.match(r"^[a-zA-Z\s'-]+$", name):
-                        return {"client_name": name}
-            
-            return {"client_name": ""}
+            table = self._client_table()
+            if table is None:
+                names = [""] * len(texts)
+            else:
+                names = [self._match_name_pattern(text, table) for text in texts]
+
+            misses = [i for i, name in enumerate(names) if not name]
+            if misses:
+                docs = self.nlp.pipe((texts[i] for i in misses), batch_size=32)
+                for i, doc in zip(misses, docs):
+                    names[i] = self._person_from_doc(doc)
+
+            return [{"client_name": name} for name in names]
             
         except Exception as e:
             logger.error(f"Name extraction error: {str(e)}")
-            return {"client_name": ""}
+            return [{"client_name": ""} for _ in texts]
+
+    def extract_person_name(self, text: str) -> Dict[str, str]:
+        """Extract person name from text, trying a name pattern before NER."""
+        return self.extract_person_names([text])[0]
 
 class OllamaClient:
+    # Models in order of preference
+    MODELS_TO_TRY = ['gemma2:2b-instruct-q4_K_M', 'gemma:2b', 'llama2', 'mistral']
+
     def __init__(self, base_url: str = 'http://localhost:11434'):
         self.base_url = base_url
+        # Keep-alive session for the status and model-list calls
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+        self.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+        self.is_running = False
         self.available_models = self.get_available_models()
 
     def get_available_models(self) -> list:
-        """Get list of available models from Ollama."""
+        """Get list of available models from Ollama, recording whether the server answered."""
         try:
-            response = requests.get(f'{self.base_url}/api/tags')
+            response = self.session.get(f'{self.base_url}/api/tags')
+            self.is_running = response.status_code == 200
             if response.status_code == 200:
-                return [model['name'] for model in response.json()['models']]
+                return [model['name'] for model in orjson.loads(response.content)['models']]
             return []
         except Exception as e:
+            self.is_running = False
             logger.error(f"Error getting available models: {str(e)}")
             return []
 
     def check_ollama_status(self) -> bool:
-        """Check if Ollama server is running and responsive."""
-        try:
-            response = requests.get(f'{self.base_url}/api/version')
-            return response.status_code == 200
-        except:
-            return False
+        """Check if Ollama server answered the model-list request, without another round trip."""
+        return self.is_running
+
+    async def open_session(self) -> aiohttp.ClientSession:
+        """Session for one click, shared by warm_up and generate_response so they reuse a connection."""
+        # 30 seconds timeout between chunks; a streamed reply may take longer in total
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+        return aiohttp.ClientSession(timeout=timeout)
+
+    async def warm_up(self, session: aiohttp.ClientSession) -> None:
+        """Ask Ollama to load the preferred available model without generating anything."""
+        model = next((m for m in self.MODELS_TO_TRY if m in self.available_models), None)
+        if model is None:
+            return
 
-    def generate_response(self, prompt: str, client_info: Dict[str, Any]) -> str:
-        """Generate response using Ollama API with retries and fallback."""
+        # Loading a model sends nothing back until it is done, so bound the whole request instead
+        timeout = aiohttp.ClientTimeout(total=120, sock_connect=30)
+        try:
+            async with session.post(f'{self.base_url}/api/generate', data=orjson.dumps({'model': model}), timeout=timeout) as response:
+                await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # generate_response retries and falls back on its own
+            logger.warning(f"Could not warm up model {model}: {str(e)}")
+
+    async def generate_response(self, session: aiohttp.ClientSession, prompt: str, client_info: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream a response from the Ollama API with retries and fallback."""
         max_retries = 3
         retry_delay = 1  # seconds
         
@@ -140,41 +298,54 @@ class OllamaClient:
             {"role": "user", "content": prompt}
         ]
 
-        # Try different models in order of preference
-        models_to_try = ['gemma:2b', 'llama2', 'mistral']
         available_models = set(self.available_models)
 
-        for model in models_to_try:
+        # Only the model changes between attempts
+        data = {
+            "messages": messages,
+            "stream": True
+        }
+        headers = {'Content-Type': 'application/json'}
+
+        for model in self.MODELS_TO_TRY:
             if model not in available_models:
                 continue
 
+            # Serialize once per model rather than on every retry
+            data["model"] = model
+            body = orjson.dumps(data)
+
             for attempt in range(max_retries):
+                streamed = False
                 try:
-                    data = {
-                        "model": model,
-                        "messages": messages,
-                        "stream": False
-                    }
-
-                    response = requests.post(
-                        f'{self.base_url}/api/chat',
-                        json=data,
-                        timeout=30  # 30 seconds timeout
-                    )
-
-                    if response.status_code == 200:
-                        return response.json()['message']['content']
-
-                except requests.exceptions.Timeout:
+                    async with session.post(f'{self.base_url}/api/chat', data=body, headers=headers) as response:
+                        if response.status == 200:
+                            # Ollama streams one JSON object per line until "done" is set
+                            async for line in response.content:
+                                if not line.strip():
+                                    continue
+                                chunk = orjson.loads(line)
+                                content = chunk.get('message', {}).get('content')
+                                if content:
+                                    streamed = True
+                                    yield content
+                                if chunk.get('done'):
+                                    return
+
+                except asyncio.TimeoutError:
                     logger.warning(f"Timeout with model {model}, attempt {attempt + 1}")
                 except Exception as e:
                     logger.error(f"Error with model {model}, attempt {attempt + 1}: {str(e)}")
 
+                if streamed:
+                    # Part of the reply is already on screen; retrying would repeat it
+                    return
+
                 if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
+                    await asyncio.sleep(retry_delay)
 
         # Fallback response if all models fail
-        return self.generate_fallback_response(client_info)
+        yield self.generate_fallback_response(client_info)
 
     def generate_fallback_response(self, client_info: Dict[str, Any]) -> str:
         """Generate a fallback response when LLM is unavailable."""
@@ -191,6 +362,108 @@ class OllamaClient:
                 "you can register as a new client through our website or contact our support team for assistance."
             )
 
+@st.cache_resource(ttl=300)
+def get_ollama_client() -> OllamaClient:
+    """Share one OllamaClient across reruns, refreshing its model list every five minutes."""
+    return OllamaClient()
+
+@contextlib.contextmanager
+def click_event_loop(ollama_client: OllamaClient) -> Iterator[Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]]:
+    """Event loop and Ollama session for one click; unlike asyncio.run the loop stays open while a response streams."""
+    loop = asyncio.new_event_loop()
+    session = loop.run_until_complete(ollama_client.open_session())
+    try:
+        yield loop, session
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(session.close())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+def iterate_on_loop(loop: asyncio.AbstractEventLoop, agen: AsyncIterator[str]) -> Iterator[str]:
+    """Drive an async generator from synchronous code so st.write_stream can consume it."""
+    while True:
+        try:
+            yield loop.run_until_complete(agen.__anext__())
+        except StopAsyncIteration:
+            return
+
+async def to_script_thread(func, *args):
+    """Run a blocking call in a worker thread that can still write to the Streamlit page."""
+    ctx = get_script_run_ctx()
+
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return func(*args)
+
+    return await asyncio.to_thread(run)
+
+def resolve_client(name_extractor: NameExtractor, client_manager: ClientManager, prompt: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Extract the client name from a prompt and look it up; both are None if no name is found."""
+    client_name = name_extractor.extract_person_name(prompt).get('client_name')
+    if not client_name:
+        return None, None
+    return client_name, client_manager.check_client(client_name)
+
+async def resolve_client_while_warming(
+    ollama_client: OllamaClient, session: aiohttp.ClientSession,
+    name_extractor: NameExtractor, client_manager: ClientManager, prompt: str
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Resolve the prompt's client in a worker thread while Ollama loads the model."""
+    warm_up = asyncio.ensure_future(ollama_client.warm_up(session))
+    try:
+        client_name, client_info = await to_script_thread(resolve_client, name_extractor, client_manager, prompt)
+    except BaseException:
+        warm_up.cancel()
+        raise
+
+    if client_name is None:
+        # No reply will be generated, so don't wait for the model
+        warm_up.cancel()
+        await asyncio.gather(warm_up, return_exceptions=True)
+    else:
+        # The chat request would wait for the load anyway
+        await warm_up
+    return client_name, client_info
+
+@st.fragment
+def chat_fragment(client_manager: ClientManager, name_extractor: NameExtractor, ollama_client: OllamaClient):
+    """Prompt, button and response; a click reruns only this block, not the setup in main."""
+    try:
+        st.write("Enter your prompt with a client's name to get information")
+        user_prompt = st.text_area("Enter your prompt:", key="user_prompt")
+
+        if st.button("Get Response"):
+            if not user_prompt:
+                st.warning("Please enter a prompt")
+                return
+
+            with st.spinner("Processing..."), click_event_loop(ollama_client) as (loop, session):
+                # Extract the client name and check it in the database while the model loads
+                client_name, client_info = loop.run_until_complete(
+                    resolve_client_while_warming(ollama_client, session, name_extractor, client_manager, user_prompt)
+                )
+
+                if not client_name:
+                    st.error("Could not extract a valid person name from the prompt")
+                    return
+
+                # Display results, streaming the response as it is generated
+                st.subheader("Response:")
+                response = ollama_client.generate_response(session, user_prompt, client_info)
+                st.write_stream(iterate_on_loop(loop, response))
+
+                st.subheader("Client Status:")
+                if client_info['exists']:
+                    st.success(f"✓ {client_name} is a registered client")
+                    st.info(f"📧 Email: {client_info['email']}")
+                else:
+                    st.warning(f"⚠️ {client_name} is not found in our client database")
+
+    except Exception as e:
+        logger.error(f"Error in chat processing: {str(e)}")
+        st.error(f"An error occurred: {str(e)}")
+
 def main():
     st.set_page_config(page_title="Meeting Scheduling Chatbot", layout="wide")
     st.title("Meeting Scheduling Chatbot")
@@ -205,11 +478,13 @@ def main():
 
     try:
         client_manager = ClientManager(db)
-        name_extractor = NameExtractor()
-        ollama_client = OllamaClient()
+        name_extractor = NameExtractor(client_manager.collection)
+        ollama_client = get_ollama_client()
 
         # Check Ollama status
         if not ollama_client.check_ollama_status():
+            # Don't keep serving the cached client once the user starts Ollama
+            get_ollama_client.clear()
             st.warning("⚠️ Ollama service is not running. Please start Ollama service first.")
             st.info("To start Ollama, open a terminal and run: `ollama serve`")
             return
@@ -219,49 +494,15 @@ def main():
         if available_models:
             st.success(f"✓ Ollama is running with available models: {', '.join(available_models)}")
         else:
-            st.warning("⚠️ No models available. Please pull a model using: `ollama pull gemma:2b`")
+            get_ollama_client.clear()
+            st.warning("⚠️ No models available. Please pull a model using: `ollama pull gemma2:2b-instruct-q4_K_M`")
             return
 
-        st.write("Enter your prompt with a client's name to get information")
-        user_prompt = st.text_area("Enter your prompt:", key="user_prompt")
-
-        if st.button("Get Response"):
-            if not user_prompt:
-                st.warning("Please enter a prompt")
-                return
-
-            with st.spinner("Processing..."):
-                # Extract client name
-                extracted_name = name_extractor.extract_person_name(user_prompt)
-                client_name = extracted_name.get('client_name')
-
-                if not client_name:
-                    st.error("Could not extract a valid person name from the prompt")
-                    return
-
-                # Check client in database
-                client_info = client_manager.check_client(client_name)
-
-                # Get response
-                response = ollama_client.generate_response(user_prompt, client_info)
-
-                # Display results
-                st.subheader("Response:")
-                st.write(response)
-
-                st.subheader("Client Status:")
-                if client_info['exists']:
-                    st.success(f"✓ {client_name} is a registered client")
-                    st.info(f"📧 Email: {client_info['email']}")
-                else:
-                    st.warning(f"⚠️ {client_name} is not found in our client database")
+        chat_fragment(client_manager, name_extractor, ollama_client)
 
     except Exception as e:
         logger.error(f"Error in main processing: {str(e)}")
         st.error(f"An error occurred: {str(e)}")
-    
-    finally:
-        db_connection.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
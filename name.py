@@ -1,14 +1,24 @@
 import spacy
 
-# Load spaCy's English NER model
-nlp = spacy.load("en_core_web_sm")
+# spaCy's English NER model, loaded on first use rather than at import time
+_nlp = None
+
+def _get_nlp():
+    global _nlp
+    if _nlp is None:
+        # Only the NER pipe is needed; excluded components are never loaded
+        _nlp = spacy.load(
+            "en_core_web_sm",
+            exclude=["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+        )
+    return _nlp
 
 def extract_client_name(prompt):
     """
     Extract the client's name from the user's prompt using Named Entity Recognition (NER).
     """
     # Process the prompt using spaCy
-    doc = nlp(prompt)
+    doc = _get_nlp()(prompt)
     
     # Look for PERSON entities in the text
     for ent in doc.ents:
@@ -17,7 +27,8 @@ def extract_client_name(prompt):
     
     return {"client_name": "Could not extract a person name from the prompt"}
 
-# Example prompt
-prompt = "I want to schedule a meeting with John Doe on Wednesday from 6 pm"
-client_info = extract_client_name(prompt)
-print(client_info)
+if __name__ == "__main__":
+    # Example prompt
+    prompt = "I want to schedule a meeting with John Doe on Wednesday from 6 pm"
+    client_info = extract_client_name(prompt)
+    print(client_info)
\ No newline at end of file